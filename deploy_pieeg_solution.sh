@@ -20,7 +20,7 @@ if [ ! -f "pieeg_env/bin/activate" ]; then
     echo "   cd ~/PiEEG-16"
     echo "   python3 -m venv pieeg_env"
     echo "   source pieeg_env/bin/activate"
-    echo "   pip install gpiod==1.5.4 spidev matplotlib scipy neurokit2 numpy"
+    echo "   pip install gpiod==1.5.4 spidev matplotlib scipy numpy"
     exit 1
 fi
 
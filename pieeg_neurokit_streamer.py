@@ -1,15 +1,22 @@
 #!/usr/bin/env python3
 """
-PiEEG-16 Native Streaming with NeuroKit2 Integration
-Streams 16-channel EEG data at 250 Hz via TCP/JSON
+PiEEG-16 Native Streaming with SciPy Filtering
+Streams 16-channel EEG data at 250 Hz via TCP as binary float32 frames
 """
 
 import json
+import os
 import time
 import socket
+import selectors
+import struct
 import threading
 import numpy as np
-import neurokit2 as nk
+from scipy import signal
+try:
+    from numba import njit, prange
+except ImportError:  # Optional: fall back to the NumPy decoder and SciPy filters
+    njit = None
 import spidev
 import gpiod
 import subprocess
@@ -20,6 +27,26 @@ import logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Wire format: u32 length prefix, then this header followed by little-endian
+# float32 samples laid out (channels, samples) in C order
+FRAME_HEADER = struct.Struct('<dHHHH')  # timestamp, channels, samples, sampling rate, reserved
+MSG_MORE = getattr(socket, 'MSG_MORE', 0)  # Linux only: hold header until payload is queued
+
+# ADS1299 LSB in µV (4.5 V reference over the 24-bit range)
+ADS1299_SCALE = 4.5e6 / 16777215
+
+# Blocks buffered between the acquisition thread and the broadcaster
+RING_BLOCKS = 8
+
+# Capture file: this header, then from CAPTURE_DATA_OFFSET a ring of little-endian
+# float32 (samples, channels). The write index is the next row to be written, i.e.
+# the oldest row once the ring has wrapped; NaN rows mark samples that were not captured
+CAPTURE_HEADER = struct.Struct('<4sHHHHQQQQ')  # magic, version, channels, sampling rate, reserved,
+                                               # capacity, write index, samples written, dropped blocks
+CAPTURE_MAGIC = b'PEEG'
+CAPTURE_VERSION = 1
+CAPTURE_DATA_OFFSET = 64
+
 class Config:
     # Load config with fallback
     try:
@@ -32,21 +59,23 @@ class Config:
             "sampling_rate": 250,
             "spi_bus": 0,
             "spi_device": 0,
-            "chip_select_line": 19,
+            "drdy_line": 26,
             "buffer_size_seconds": 2,
             "tcp_ip": "0.0.0.0",
             "tcp_port": 6677,
             "process_filtering": True,
             "expected_min_voltage": -100,
             "expected_max_voltage": 100,
-            "min_std_threshold": 0.1
+            "min_std_threshold": 0.1,
+            "capture_file": None,
+            "capture_seconds": 3600
         }
     
     CHANNELS = config['channels']
     SAMPLING_RATE = config['sampling_rate']
     SPI_BUS = config['spi_bus']
     SPI_DEVICE = config['spi_device']
-    CS_LINE = config['chip_select_line']
+    DRDY_LINE = config.get('drdy_line', 26)
     BUFFER_SIZE_SECONDS = config['buffer_size_seconds']
     TCP_IP = config['tcp_ip']
     TCP_PORT = config['tcp_port']
@@ -54,15 +83,181 @@ class Config:
     EXPECTED_MIN_VOLTAGE = config['expected_min_voltage']
     EXPECTED_MAX_VOLTAGE = config['expected_max_voltage']
     MIN_STD_THRESHOLD = config['min_std_threshold']
+    BLOCK_SAMPLES = max(1, int(SAMPLING_RATE * BUFFER_SIZE_SECONDS))
+    CAPTURE_FILE = config.get('capture_file')
+    CAPTURE_SECONDS = config.get('capture_seconds', 3600)
+
+def decode_block_numpy(raw1, raw2, out):
+    """
+    Decode 24-bit two's complement ADS1299 frames into µV:
+    channels 1-8 from raw1, channels 9-16 from raw2
+    """
+    samples = raw1.shape[0]
+    for raw, rows in ((raw1, out[:8]), (raw2, out[8:])):
+        r = raw[:, 3:].reshape(samples, 8, 3)
+        v = (r[..., 0].astype(np.int32) << 16) | (r[..., 1].astype(np.int32) << 8) | r[..., 2]
+        v -= (v & 0x800000) << 1
+        np.multiply(v.T, ADS1299_SCALE, out=rows, casting='unsafe')
+
+if njit is not None:
+    @njit(cache=True, fastmath=True, nogil=True)
+    def decode_block(raw1, raw2, out):
+        """Same as decode_block_numpy, fused into a single compiled pass"""
+        for i in range(raw1.shape[0]):
+            for ch in range(8):
+                a = 3 + 3 * ch
+                v1 = (np.int32(raw1[i, a]) << 16) | (np.int32(raw1[i, a + 1]) << 8) | np.int32(raw1[i, a + 2])
+                v2 = (np.int32(raw2[i, a]) << 16) | (np.int32(raw2[i, a + 1]) << 8) | np.int32(raw2[i, a + 2])
+                out[ch, i] = (v1 - ((v1 & 0x800000) << 1)) * ADS1299_SCALE
+                out[ch + 8, i] = (v2 - ((v2 & 0x800000) << 1)) * ADS1299_SCALE
+else:
+    decode_block = decode_block_numpy
+
+def filter_block_scipy(x, sos_bp, sos_notch, zi_bp, zi_notch, out):
+    """
+    Run the band-pass then notch SOS cascades along axis 1 of a
+    (channels, samples) block, updating the filter states in place
+    """
+    y, zi_bp[...] = signal.sosfilt(sos_bp, x, axis=1, zi=zi_bp)
+    y, zi_notch[...] = signal.sosfilt(sos_notch, y, axis=1, zi=zi_notch)
+    np.copyto(out, y, casting='same_kind')
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True, nogil=True)
+    def filter_block(x, sos_bp, sos_notch, zi_bp, zi_notch, out):
+        """
+        Same as filter_block_scipy, with both cascades fused per sample and
+        channels spread across cores
+        """
+        for ch in prange(x.shape[0]):
+            for i in range(x.shape[1]):
+                v = np.float64(x[ch, i])
+                # Transposed direct form II biquads, as in scipy.signal.sosfilt
+                for k in range(sos_bp.shape[0]):
+                    y = sos_bp[k, 0] * v + zi_bp[k, ch, 0]
+                    zi_bp[k, ch, 0] = sos_bp[k, 1] * v - sos_bp[k, 4] * y + zi_bp[k, ch, 1]
+                    zi_bp[k, ch, 1] = sos_bp[k, 2] * v - sos_bp[k, 5] * y
+                    v = y
+                for k in range(sos_notch.shape[0]):
+                    y = sos_notch[k, 0] * v + zi_notch[k, ch, 0]
+                    zi_notch[k, ch, 0] = sos_notch[k, 1] * v - sos_notch[k, 4] * y + zi_notch[k, ch, 1]
+                    zi_notch[k, ch, 1] = sos_notch[k, 2] * v - sos_notch[k, 5] * y
+                    v = y
+                out[ch, i] = v
+else:
+    filter_block = filter_block_scipy
 
 class PiEEGStreamer:
     def __init__(self):
         self.sample_count = 0
         self.last_sample_time = time.time()
+        self.clients = set()
+        self.running = False
+        self.block_ready = threading.Event()
+        self.allocate_buffers(Config.BLOCK_SAMPLES)
+        self.setup_capture()
+        self.setup_filters()
+        self.warm_up_kernels()
         self.setup_spi()
         self.setup_tcp()
-        self.clients = []
         
+    def allocate_buffers(self, samples):
+        """Preallocate per-block buffers so the streaming loop reuses them"""
+        self.raw_frames_1 = np.empty((samples, 27), dtype=np.uint8)  # 27 bytes: status + 8 channels * 3 bytes
+        self.raw_frames_2 = np.empty_like(self.raw_frames_1)
+        self.processed_block = np.empty((Config.CHANNELS, samples), dtype=np.float32)
+
+        # Single-producer/single-consumer ring of raw blocks. head counts blocks
+        # published by the acquisition thread, tail counts blocks taken by the
+        # broadcaster; each counter has one writer, so no lock is needed
+        self.ring = np.empty((RING_BLOCKS, Config.CHANNELS, samples), dtype=np.float32)
+        self.head = 0
+        self.tail = 0
+
+    def warm_up_kernels(self):
+        """
+        Compile the Numba kernels before acquisition starts; compiling on the
+        first block would stall the DRDY-paced reads long enough to lose samples
+        """
+        if njit is None:
+            return
+        start = time.time()
+        # Same argument types as read_eeg_data, so the block reuses this specialisation
+        self.raw_frames_1.fill(0)
+        self.raw_frames_2.fill(0)
+        block = self.ring[0, :, :Config.BLOCK_SAMPLES]
+        decode_block(self.raw_frames_1, self.raw_frames_2, block)
+        # Throwaway filter state so the real one is still initialised from the first block
+        zi_bp = np.zeros((self.sos_bp.shape[0], Config.CHANNELS, 2))
+        zi_notch = np.zeros((self.sos_notch.shape[0], Config.CHANNELS, 2))
+        filter_block(block, self.sos_bp, self.sos_notch, zi_bp, zi_notch,
+                     self.processed_block[:, :Config.BLOCK_SAMPLES])
+        logger.info(f"Compiled EEG kernels in {time.time() - start:.2f}s")
+
+    def setup_capture(self):
+        """
+        Memory-map a circular raw capture file (see CAPTURE_HEADER), if configured.
+        A compatible existing capture is resumed; an incompatible one is left
+        untouched and a timestamped file is created next to it
+        """
+        self.capture = None
+        if not Config.CAPTURE_FILE:
+            return
+        try:
+            capacity = max(int(Config.CAPTURE_SECONDS * Config.SAMPLING_RATE), Config.BLOCK_SAMPLES)
+            size = CAPTURE_DATA_OFFSET + capacity * Config.CHANNELS * 4
+            path = Config.CAPTURE_FILE
+            resume = os.path.exists(path) and self.capture_compatible(path, capacity, size)
+            if os.path.exists(path) and not resume:
+                root, ext = os.path.splitext(path)
+                path = f"{root}-{time.strftime('%Y%m%d-%H%M%S')}{ext}"
+                logger.warning(f"{Config.CAPTURE_FILE} holds an incompatible capture, writing {path} instead")
+
+            self.capture_file = np.memmap(path, dtype=np.uint8, mode='r+' if resume else 'w+', shape=(size,))
+            self.capture = self.capture_file[CAPTURE_DATA_OFFSET:].view('<f4').reshape(capacity, Config.CHANNELS)
+            if resume:
+                header = CAPTURE_HEADER.unpack_from(self.capture_file)
+                self.capture_pos, self.capture_samples, self.capture_dropped = header[6:]
+                self.write_capture_gap(1)  # Mark the restart
+                logger.info(f"Resuming raw EEG capture in {path} at sample {self.capture_samples}")
+            else:
+                self.capture_pos = self.capture_samples = self.capture_dropped = 0
+                self.write_capture_header()
+                logger.info(f"Capturing raw EEG to {path} ({capacity} samples)")
+        except Exception as e:
+            logger.error(f"Capture setup failed: {e}")
+            raise
+
+    def capture_compatible(self, path, capacity, size):
+        """Check that an existing capture file has the layout this run would write"""
+        if os.path.getsize(path) != size:
+            return False
+        with open(path, 'rb') as f:
+            header = CAPTURE_HEADER.unpack(f.read(CAPTURE_HEADER.size))
+        return header[:6] == (CAPTURE_MAGIC, CAPTURE_VERSION, Config.CHANNELS,
+                              Config.SAMPLING_RATE, 0, capacity)
+
+    def write_capture_header(self):
+        """Publish the ring position so readers can unroll the capture"""
+        CAPTURE_HEADER.pack_into(self.capture_file, 0, CAPTURE_MAGIC, CAPTURE_VERSION, Config.CHANNELS,
+                                 Config.SAMPLING_RATE, 0, len(self.capture), self.capture_pos,
+                                 self.capture_samples, self.capture_dropped)
+
+    def write_capture(self, data):
+        """Copy a (channels, samples) block into the capture ring, wrapping at the end"""
+        n = data.shape[1]
+        start = self.capture_pos
+        first = min(n, len(self.capture) - start)
+        self.capture[start:start + first] = data[:, :first].T
+        self.capture[:n - first] = data[:, first:].T
+        self.capture_pos = (start + n) % len(self.capture)
+        self.capture_samples += n
+        self.write_capture_header()
+
+    def write_capture_gap(self, samples):
+        """Write NaN rows for samples that were not captured, keeping the ring time-aligned"""
+        self.write_capture(np.full((Config.CHANNELS, samples), np.nan, dtype=np.float32))
+
     def setup_spi(self):
         """Initialize SPI and GPIO for PiEEG-16 (two ADS1299 chips)"""
         try:
@@ -82,7 +277,8 @@ class PiEEGStreamer:
             self.spi_2.mode = 0b01
             self.spi_2.bits_per_word = 8
 
-            # Setup chip select with auto-detection (works on any Pi model)
+            # Setup GPIO chip with auto-detection (works on any Pi model); chip
+            # select is driven by spidev on hardware CE0/CE1, not by GPIO
             try:
                 chip_name = subprocess.check_output(["gpiodetect"], text=True).splitlines()[0].split()[0]
                 logger.info(f"Auto-detected GPIO chip: {chip_name}")
@@ -90,8 +286,9 @@ class PiEEGStreamer:
             except Exception as e:
                 logger.warning(f"Auto-detection failed: {e}, falling back to gpiochip4")
                 self.chip = gpiod.chip("gpiochip4")
-            self.cs_line = self.chip.get_line(Config.CS_LINE)
-            self.cs_line.request(consumer="PiEEG", type=gpiod.LINE_REQ_DIR_OUT, default_val=1)
+            # DRDY goes low when the ADS1299 has a new sample ready
+            self.drdy_line = self.chip.get_line(Config.DRDY_LINE)
+            self.drdy_line.request(consumer="PiEEG-DRDY", type=gpiod.LINE_REQ_EV_FALLING_EDGE)
 
             # ADS1299 commands and registers
             self.WAKEUP = 0x02
@@ -112,14 +309,15 @@ class PiEEGStreamer:
             self.CH7SET = 0x0B
             self.CH8SET = 0x0C
 
+            # Dummy bytes clocked out while reading a 27-byte sample frame
+            self.read_tx = bytes(27)
+
             # Initialize both ADS1299 chips
             for spi_dev in [self.spi, self.spi_2]:
-                self.cs_line.set_value(0)
                 spi_dev.xfer([self.WAKEUP])
                 spi_dev.xfer([self.STOP])
                 spi_dev.xfer([self.RESET])
                 spi_dev.xfer([self.SDATAC])
-                self.cs_line.set_value(1)
                 time.sleep(0.1)
 
                 # Configure registers (from 1.Save_Data.py)
@@ -137,10 +335,8 @@ class PiEEGStreamer:
                 for reg in [self.CH1SET, self.CH2SET, self.CH3SET, self.CH4SET,
                            self.CH5SET, self.CH6SET, self.CH7SET, self.CH8SET]:
                     self.write_byte(spi_dev, reg, 0x00)
-                self.cs_line.set_value(0)
                 spi_dev.xfer([self.RDATAC])
                 spi_dev.xfer([self.START])
-                self.cs_line.set_value(1)
 
             logger.info("PiEEG SPI initialized for both ADS1299 chips")
         except Exception as e:
@@ -150,51 +346,58 @@ class PiEEGStreamer:
     def write_byte(self, spi_dev, register, data):
         """Write to ADS1299 register"""
         write_cmd = 0x40 | register
-        self.cs_line.set_value(0)
         spi_dev.xfer([write_cmd, 0x00, data])
-        self.cs_line.set_value(1)
 
     def read_eeg_data(self, samples=None):
         """
-        Read EEG data from two ADS1299 chips (16 channels) via SPI
+        Read EEG data from two ADS1299 chips (16 channels) via SPI into the
+        next free ring slot; the slot is published by acquire()
         Based on 1.Save_Data.py
         """
         if samples is None:
-            samples = Config.SAMPLING_RATE
+            samples = Config.BLOCK_SAMPLES
             
-        data = np.zeros((Config.CHANNELS, samples))
-        data_test = 0x7FFFFF
-        data_check = 0xFFFFFF
+        if samples > self.ring.shape[2]:
+            raise ValueError(f"Block of {samples} samples exceeds ring slot of {self.ring.shape[2]}")
+        raw1 = self.raw_frames_1[:samples]
+        raw2 = self.raw_frames_2[:samples]
+        data = self.ring[self.head % RING_BLOCKS, :, :samples]
+        drdy_timeouts = 0
+
+        # Bind per-sample lookups to locals; this loop runs at the full sample rate
+        wait_drdy, read_drdy = self.drdy_line.event_wait, self.drdy_line.event_read
+        xfer_1, xfer_2, tx = self.spi.xfer3, self.spi_2.xfer3, self.read_tx
 
         for i in range(samples):
-            self.cs_line.set_value(0)
-            output_1 = self.spi.readbytes(27)  # 27 bytes: status + 8 channels * 3 bytes
-            output_2 = self.spi_2.readbytes(27)
-            self.cs_line.set_value(1)
-
-            # Validate status bytes (192, 0, 8 per 1.Save_Data.py)
-            if output_1[0] != 192 or output_1[1] != 0 or output_1[2] != 8 or \
-               output_2[0] != 192 or output_2[1] != 0 or output_2[2] != 8:
-                logger.warning("Invalid status bytes")
-                continue
+            # Block until the ADC signals a new sample (4 ms period at 250 Hz)
+            if wait_drdy(nsec=8000000):
+                read_drdy()
+            else:
+                drdy_timeouts += 1
+
+            # Each chip sits on its own hardware CE line, asserted by spidev
+            raw1[i] = xfer_1(tx)
+            raw2[i] = xfer_2(tx)
 
-            # Process channels 1-8 (first ADS1299)
-            for ch, a in enumerate(range(3, 25, 3)):
-                voltage = (output_1[a] << 16) | (output_1[a+1] << 8) | output_1[a+2]
-                convert_voltage = voltage | data_test
-                if convert_voltage == data_check:
-                    voltage = voltage - 16777216
-                data[ch, i] = round(1000000 * 4.5 * (voltage / 16777215), 2)
+        if drdy_timeouts:
+            logger.warning(f"DRDY timed out for {drdy_timeouts} samples")
 
-            # Process channels 9-16 (second ADS1299)
-            for ch, a in enumerate(range(3, 25, 3), start=8):
-                voltage = (output_2[a] << 16) | (output_2[a+1] << 8) | output_2[a+2]
-                convert_voltage = voltage | data_test
-                if convert_voltage == data_check:
-                    voltage = voltage - 16777216
-                data[ch, i] = round(1000000 * 4.5 * (voltage / 16777215), 2)
+        # Validate status bytes (192, 0, 8 per 1.Save_Data.py)
+        valid = np.all((raw1[:, :3] == (192, 0, 8)) & (raw2[:, :3] == (192, 0, 8)), axis=1)
 
-            time.sleep(1.0 / Config.SAMPLING_RATE)
+        decode_block(raw1, raw2, data)
+
+        # Repair bad samples from their valid neighbours so the block keeps
+        # exact sample cadence and the filter state sees no zero spikes
+        if not valid.all():
+            bad = np.flatnonzero(~valid)
+            good = np.flatnonzero(valid)
+            if good.size == 0:
+                logger.error("Invalid EEG data: No valid status bytes in block")
+                return None
+            logger.warning(f"Invalid status bytes in {bad.size} samples, interpolating")
+            for row in data:
+                row[bad] = np.interp(bad, good, row[good])
 
         # Validate data
         if np.any(np.isnan(data)) or np.any(np.isinf(data)):
@@ -203,33 +406,52 @@ class PiEEGStreamer:
         if data.std() < Config.MIN_STD_THRESHOLD:
             logger.error("Invalid EEG data: Constant or near-constant")
             return None
-        if data.min() < Config.EXPECTED_MIN_VOLTAGE or data.max() > Config.EXPECTED_MAX_VOLTAGE:
-            logger.warning(f"EEG data out of range: min={data.min():.2f}µV, max={data.max():.2f}µV")
+        min_val, max_val = data.min(), data.max()
+        if min_val < Config.EXPECTED_MIN_VOLTAGE or max_val > Config.EXPECTED_MAX_VOLTAGE:
+            logger.warning(f"EEG data out of range: min={min_val:.2f}µV, max={max_val:.2f}µV")
 
         return data
     
+    def setup_filters(self):
+        """Design band-pass (1-40 Hz) and 50 Hz notch filters once for all channels"""
+        self.sos_bp = signal.butter(5, [1, 40], btype='band', fs=Config.SAMPLING_RATE, output='sos')
+        self.sos_notch = signal.tf2sos(*signal.iirnotch(50, Q=30, fs=Config.SAMPLING_RATE))
+        # Filter state carried across blocks, shape (sections, channels, 2)
+        self.zi_bp = None
+        self.zi_notch = None
+
     def process_data(self, data):
-        """Process EEG data with NeuroKit2"""
-        if data is None or not Config.PROCESS_FILTERING:
-            return data
-            
-        processed_data = np.zeros_like(data)
-        for ch in range(Config.CHANNELS):
-            try:
-                if np.all(data[ch] == data[ch, 0]) or len(data[ch]) < 2:
-                    logger.warning(f"Skipping channel {ch}: Constant or too few samples")
-                    processed_data[ch] = data[ch]
-                    continue
-                filtered = nk.signal_detrend(data[ch], method="polynomial", order=1)
-                filtered = nk.signal_filter(filtered, sampling_rate=Config.SAMPLING_RATE, 
-                                         lowcut=1, highcut=40, method='butterworth', order=5)
-                filtered = nk.signal_filter(filtered, sampling_rate=Config.SAMPLING_RATE,
-                                         method='powerline', powerline=50)
-                processed_data[ch] = filtered
-            except Exception as e:
-                logger.warning(f"Processing failed for channel {ch}: {e}")
-                processed_data[ch] = data[ch]
-        
+        """
+        Filter all channels at once with causal IIR filters whose state
+        carries over between blocks, so the stream has no block-edge transients
+        """
+        if data is None:
+            return None
+
+        # Never hand back the ring slot itself: the acquisition thread may overwrite
+        # it while the block is being broadcast
+        processed_data = self.processed_block[:, :data.shape[1]]
+        if not Config.PROCESS_FILTERING:
+            np.copyto(processed_data, data)
+            return processed_data
+
+        try:
+            if self.zi_bp is None:
+                # Start in steady state for the first sample to avoid a DC step response
+                self.zi_bp = signal.sosfilt_zi(self.sos_bp)[:, None, :] * data[None, :, :1]
+                self.zi_notch = np.zeros((self.sos_notch.shape[0], data.shape[0], 2))
+            filter_block(data, self.sos_bp, self.sos_notch, self.zi_bp, self.zi_notch, processed_data)
+        except Exception as e:
+            logger.warning(f"Processing failed: {e}")
+            np.copyto(processed_data, data)
+            return processed_data
+
+        # Pass constant channels (e.g. disconnected electrodes) through unfiltered
+        constant = np.all(data == data[:, :1], axis=1)
+        if constant.any():
+            logger.warning(f"Skipping channels {np.flatnonzero(constant).tolist()}: Constant")
+            processed_data[constant] = data[constant]
+
         return processed_data
     
     def setup_tcp(self):
@@ -239,78 +461,125 @@ class PiEEGStreamer:
             self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             self.server_socket.bind((Config.TCP_IP, Config.TCP_PORT))
             self.server_socket.listen(5)
-            self.server_socket.settimeout(1.0)
+            self.server_socket.setblocking(False)
+            self.selector = selectors.DefaultSelector()
+            self.selector.register(self.server_socket, selectors.EVENT_READ)
             logger.info(f"TCP server started on {Config.TCP_IP}:{Config.TCP_PORT}")
         except Exception as e:
             logger.error(f"TCP setup failed: {e}")
             raise
 
-    def handle_client(self, client_socket, address):
-        """Handle individual client connections"""
+    def accept_client(self):
+        """Accept a new client and watch it for disconnects"""
+        client_socket, address = self.server_socket.accept()
         logger.info(f"Client connected: {address}")
-        self.clients.append(client_socket)
-        
+        client_socket.settimeout(1.0)  # Drop clients that stall a send for too long
+        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1 << 20)
+        self.selector.register(client_socket, selectors.EVENT_READ, address)
+        self.clients.add(client_socket)
+
+    def drop_client(self, client_socket):
+        """Stop streaming to a client and close its socket"""
         try:
-            while True:
-                time.sleep(0.1)  # Keep connection alive
-        except:
-            logger.info(f"Client disconnected: {address}")
-            if client_socket in self.clients:
-                self.clients.remove(client_socket)
-            client_socket.close()
+            self.clients.remove(client_socket)
+        except KeyError:
+            return  # Already dropped by the other thread
+        address = self.selector.unregister(client_socket).data
+        client_socket.close()
+        logger.info(f"Client disconnected: {address}")
+
+    def serve_clients(self):
+        """Accept clients and detect disconnects from a single selector loop"""
+        while True:
+            try:
+                events = self.selector.select(timeout=1.0)
+            except Exception as e:
+                logger.error(f"Client selector error: {e}")
+                break
+
+            for key, _ in events:
+                if key.fileobj is self.server_socket:
+                    try:
+                        self.accept_client()
+                    except Exception as e:
+                        logger.error(f"Client accept error: {e}")
+                    continue
+
+                # Clients never send data, so readability means EOF or a reset
+                try:
+                    data = key.fileobj.recv(4096)
+                except OSError:
+                    data = b''
+                if not data:
+                    self.drop_client(key.fileobj)
     
     def broadcast_data(self, data):
         """Broadcast EEG data to all connected clients"""
         if not self.clients or data is None:
             return
             
-        message = {
-            'timestamp': time.time(),
-            'channels': Config.CHANNELS,
-            'sampling_rate': Config.SAMPLING_RATE,
-            'data': data.tolist()
-        }
-        
-        json_data = json.dumps(message) + '\n'
+        # Encode once for all clients; the payload is a view of the float32 block
+        payload = memoryview(np.ascontiguousarray(data, dtype='<f4')).cast('B')
+        header = (FRAME_HEADER.size + payload.nbytes).to_bytes(4, 'little') + \
+                 FRAME_HEADER.pack(time.time(), data.shape[0], data.shape[1], Config.SAMPLING_RATE, 0)
         
-        for client in self.clients[:]:
+        for client in tuple(self.clients):
             try:
-                client.send(json_data.encode())
+                client.sendall(header, MSG_MORE)
+                client.sendall(payload)
             except Exception as e:
-                logger.error(f"Failed to send to client {client.getpeername()}: {e}")
-                self.clients.remove(client)
-                client.close()
+                logger.error(f"Failed to send to client: {e}")
+                self.drop_client(client)
     
+    def acquire(self):
+        """Producer: read blocks into the ring, never waiting on the broadcaster"""
+        while self.running:
+            try:
+                data = self.read_eeg_data(Config.BLOCK_SAMPLES)
+            except Exception as e:
+                logger.error(f"Acquisition failed: {e}")
+                break
+            if data is None:
+                logger.warning("No valid data, dropping block")
+                if self.capture is not None:
+                    self.capture_dropped += 1
+                    self.write_capture_gap(Config.BLOCK_SAMPLES)
+                continue
+            if self.capture is not None:
+                self.write_capture(data)
+            self.head += 1  # Publish the slot just written
+            self.block_ready.set()
+        self.running = False
+
     def run(self):
-        """Main streaming loop"""
-        def accept_clients():
-            while True:
-                try:
-                    client_socket, address = self.server_socket.accept()
-                    client_thread = threading.Thread(target=self.handle_client, 
-                                                  args=(client_socket, address))
-                    client_thread.daemon = True
-                    client_thread.start()
-                except socket.timeout:
-                    continue
-                except Exception as e:
-                    logger.error(f"Client accept error: {e}")
-                    break
-        
-        tcp_thread = threading.Thread(target=accept_clients)
+        """Main streaming loop: filter and broadcast blocks from the acquisition thread"""
+        tcp_thread = threading.Thread(target=self.serve_clients)
         tcp_thread.daemon = True
         tcp_thread.start()
         
+        self.running = True
+        self.acquire_thread = threading.Thread(target=self.acquire)
+        self.acquire_thread.daemon = True
+        self.acquire_thread.start()
+        
         logger.info("Starting EEG data streaming...")
         
         try:
-            while True:
-                raw_data = self.read_eeg_data(Config.SAMPLING_RATE)
-                if raw_data is None:
-                    logger.warning("No valid data, skipping broadcast")
-                    time.sleep(0.1)
+            while self.running:
+                self.block_ready.clear()
+                if self.tail == self.head:
+                    self.block_ready.wait(timeout=1.0)
                     continue
                 
+                # If the broadcaster fell a full ring behind, skip to the newest
+                # block; the producer is about to overwrite the oldest one
+                if self.head - self.tail >= RING_BLOCKS:
+                    logger.warning(f"Broadcaster overrun, dropping {self.head - 1 - self.tail} blocks")
+                    self.tail = self.head - 1
+                
+                block = self.tail
+                raw_data = self.ring[block % RING_BLOCKS]
                 processed_data = self.process_data(raw_data)
                 
                 self.sample_count += raw_data.shape[1]
@@ -318,17 +587,21 @@ class PiEEGStreamer:
                 effective_rate = raw_data.shape[1] / (current_time - self.last_sample_time) if current_time > self.last_sample_time else 0
                 self.last_sample_time = current_time
                 
-                min_val = np.min(raw_data) if raw_data is not None else 0
-                max_val = np.max(raw_data) if raw_data is not None else 0
-                std_val = np.std(raw_data) if raw_data is not None else 0
+                min_val = np.min(raw_data)
+                max_val = np.max(raw_data)
+                
+                # Drop the block if the producer lapped it while it was being read
+                if self.head - block >= RING_BLOCKS:
+                    logger.warning("Block overwritten during processing, dropping it")
+                    self.tail = block + 1
+                    continue
                 
                 self.broadcast_data(processed_data)
+                self.tail = block + 1
                 
                 logger.info(f"📈 {self.sample_count} samples | {effective_rate:.1f} Hz | "
                           f"Raw: {min_val:.1f}-{max_val:.1f}µV | Clients: {len(self.clients)}")
                 
-                time.sleep(Config.BUFFER_SIZE_SECONDS - 0.1)  # Adjust for processing time
-                
         except KeyboardInterrupt:
             logger.info("Stopping streamer...")
         finally:
@@ -337,12 +610,18 @@ class PiEEGStreamer:
     def cleanup(self):
         """Cleanup resources"""
         try:
-            for client in self.clients:
+            self.running = False
+            if hasattr(self, 'acquire_thread'):
+                self.acquire_thread.join(timeout=Config.BUFFER_SIZE_SECONDS + 1)
+            for client in tuple(self.clients):
                 client.close()
+            self.selector.close()
             self.server_socket.close()
             self.spi.close()
             self.spi_2.close()
-            self.cs_line.release()
+            self.drdy_line.release()
+            if self.capture is not None:
+                self.capture_file.flush()
             logger.info("Resources cleaned up")
         except Exception as e:
             logger.error(f"Cleanup failed: {e}")
@@ -4,17 +4,21 @@ Windows Client for PiEEG-16 Real-Time Visualization
 Connects to Pi streamer via TCP and displays EEG data
 """
 
-import json
 import socket
+import struct
 import threading
+import time
 import argparse
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
-from collections import deque
 import tkinter as tk
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
+# Must match the streamer: u32 length prefix, then this header followed by
+# little-endian float32 samples laid out (channels, samples)
+FRAME_HEADER = struct.Struct('<dHHHH')  # timestamp, channels, samples, sampling rate, reserved
+
 class EEGClient:
     def __init__(self, host='192.168.1.100', port=6677, buffer_seconds=10):
         self.host = host
@@ -23,8 +27,19 @@ class EEGClient:
         self.sampling_rate = 250
         self.channels = 16
         
-        # Data buffers
-        self.data_buffer = deque(maxlen=buffer_seconds * self.sampling_rate)
+        # Ring buffer of (samples, channels), written twice so the newest
+        # buffer_samples are always one contiguous slice ending at write_pos + buffer_samples
+        self.buffer_samples = buffer_seconds * self.sampling_rate
+        self.data_buffer = np.zeros((2 * self.buffer_samples, self.channels), dtype=np.float32)
+        self.write_pos = 0
+        self.filled = 0
+        self.total_samples = 0
+        self.last_rescale = 0.0
+        self.rx_buffer = bytearray(65536)  # Grows to the largest frame seen
+        
+        # Plot roughly 60 points per second; the eye can't resolve 250 Hz on screen
+        self.plot_decimation = max(1, self.sampling_rate // 60)
+        self.plot_points = self.buffer_samples // self.plot_decimation
         self.connected = False
         
         self.setup_gui()
@@ -40,6 +55,9 @@ class EEGClient:
         self.fig, self.axes = plt.subplots(4, 4, figsize=(12, 8))
         self.fig.suptitle("PiEEG-16 Real-Time EEG Data")
         
+        # Fixed time axis shared by every channel; only y data changes per frame
+        self.time_axis = np.arange(self.plot_points) * self.plot_decimation / self.sampling_rate
+        
         # Setup subplots for each channel
         self.lines = []
         for i in range(self.channels):
@@ -49,7 +67,7 @@ class EEGClient:
             ax.set_xlim(0, self.buffer_seconds)
             ax.set_ylim(-100, 100)  # µV
             ax.set_ylabel("µV")
-            line, = ax.plot([], [], 'b-', linewidth=0.8)
+            line, = ax.plot(self.time_axis, np.zeros(self.plot_points), 'b-', linewidth=0.8)
             self.lines.append(line)
         
         # Embed matplotlib in tkinter
@@ -87,23 +105,15 @@ class EEGClient:
     
     def receive_data(self):
         """Receive data from Pi streamer"""
-        buffer = ""
-        
         while self.connected:
             try:
-                data = self.socket.recv(4096).decode()
-                if not data:
+                prefix = self.recv_exactly(4)
+                if prefix is None:
                     break
-                
-                buffer += data
-                while '\n' in buffer:
-                    line, buffer = buffer.split('\n', 1)
-                    if line.strip():
-                        try:
-                            message = json.loads(line)
-                            self.process_message(message)
-                        except json.JSONDecodeError:
-                            continue
+                frame = self.recv_exactly(int.from_bytes(prefix, 'little'))
+                if frame is None:
+                    break
+                self.process_message(frame)
             
             except Exception as e:
                 print(f"Error receiving data: {e}")
@@ -112,54 +122,80 @@ class EEGClient:
         self.connected = False
         self.status_var.set("Disconnected")
     
-    def process_message(self, message):
-        """Process received EEG data"""
-        if 'data' in message:
-            eeg_data = np.array(message['data'])
-            
-            # Add to buffer
-            for sample_idx in range(eeg_data.shape[1]):
-                sample = eeg_data[:, sample_idx]
-                self.data_buffer.append(sample)
-            
-            # Update status
-            self.status_var.set(f"Receiving data - {len(self.data_buffer)} samples buffered")
+    def recv_exactly(self, size):
+        """Read exactly size bytes into the reusable receive buffer, None on disconnect"""
+        if size > len(self.rx_buffer):
+            self.rx_buffer = bytearray(size)
+        view = memoryview(self.rx_buffer)[:size]
+        pos = 0
+        while pos < size:
+            received = self.socket.recv_into(view[pos:])
+            if not received:
+                return None
+            pos += received
+        return view
+    
+    def process_message(self, frame):
+        """Process a received binary EEG frame"""
+        timestamp, channels, samples, sampling_rate, _ = FRAME_HEADER.unpack_from(frame)
+        eeg_data = np.frombuffer(frame, dtype='<f4', count=channels * samples,
+                                 offset=FRAME_HEADER.size).reshape(channels, samples)
+        
+        # Add to buffer, wrapping around the end of each copy
+        block = eeg_data.T[-self.buffer_samples:]
+        n = len(block)
+        start = self.write_pos
+        first = min(n, self.buffer_samples - start)
+        for offset in (0, self.buffer_samples):
+            self.data_buffer[offset + start:offset + start + first] = block[:first]
+            self.data_buffer[offset:offset + n - first] = block[first:]
+        self.write_pos = (start + n) % self.buffer_samples
+        self.filled = min(self.filled + n, self.buffer_samples)
+        self.total_samples += n
+        
+        # Update status
+        self.status_var.set(f"Receiving data - {self.filled} samples buffered")
     
     def update_plots(self, frame):
         """Update real-time plots"""
-        if not self.data_buffer:
+        if not self.filled:
             return self.lines
         
-        # Convert buffer to array
-        data_array = np.array(list(self.data_buffer))
+        # Newest buffer_samples samples, oldest first (zeros until the buffer fills)
+        start = self.write_pos
+        data_array = self.data_buffer[start:start + self.buffer_samples]
         
-        if data_array.size == 0:
-            return self.lines
+        # Decimate by striding the view, locked to absolute sample numbers so
+        # the trace doesn't shimmer as it scrolls
+        phase = (self.buffer_samples - self.total_samples) % self.plot_decimation
+        plot_data = data_array[phase:phase + self.plot_points * self.plot_decimation:self.plot_decimation]
         
-        # Time axis
-        time_axis = np.arange(len(data_array)) / self.sampling_rate
+        for ch, line in enumerate(self.lines):
+            line.set_ydata(plot_data[:, ch])
         
-        # Update each channel plot
-        for ch in range(min(self.channels, data_array.shape[1])):
-            if ch < len(self.lines):
-                self.lines[ch].set_data(time_axis, data_array[:, ch])
-                
-                # Auto-scale y-axis based on data
-                if len(data_array) > 0:
-                    y_data = data_array[:, ch]
-                    y_min, y_max = np.min(y_data), np.max(y_data)
-                    y_range = y_max - y_min
-                    if y_range > 0:
-                        margin = y_range * 0.1
-                        self.axes[ch // 4, ch % 4].set_ylim(y_min - margin, y_max + margin)
+        # Rescaling needs a full redraw, so do it at most once per second;
+        # every other frame only blits the lines
+        now = time.monotonic()
+        if now - self.last_rescale >= 1.0:
+            self.last_rescale = now
+            self.rescale_axes(data_array[-self.filled:])
         
         return self.lines
     
+    def rescale_axes(self, data_array):
+        """Fit each channel's y-axis to its 1st-99th percentile range"""
+        y_min, y_max = np.percentile(data_array, [1, 99], axis=0)
+        margin = (y_max - y_min) * 0.1
+        for ch, line in enumerate(self.lines):
+            if y_max[ch] > y_min[ch]:
+                line.axes.set_ylim(y_min[ch] - margin[ch], y_max[ch] + margin[ch])
+        self.canvas.draw()
+    
     def run(self):
         """Start the client"""
         # Setup animation
         self.ani = animation.FuncAnimation(self.fig, self.update_plots, 
-                                         interval=50, blit=False, cache_frame_data=False)
+                                         interval=50, blit=True, cache_frame_data=False)
         
         # Start GUI
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)